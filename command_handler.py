@@ -1,20 +1,62 @@
 import re
 import random
 import threading
-import json
 import os
 import time
+import tempfile
 import openai
 import pygame
 from datetime import datetime, timedelta
 
+# orjson is much faster for the reminders/schedule files; fall back to stdlib json
+try:
+    import orjson as _json_impl
+    _loads = _json_impl.loads
+    _dumps = lambda obj: _json_impl.dumps(obj, option=_json_impl.OPT_INDENT_2)
+except ImportError:
+    import json as _json_impl
+    _loads = _json_impl.loads
+    _dumps = lambda obj: _json_impl.dumps(obj, indent=2).encode()
 
 REMINDERS_FILE = os.environ.get('REMINDERS_FILE', 'reminders.json')
 COMMANDS_REFERENCE_FILE = os.environ.get('COMMANDS_REFERENCE_FILE', 'commands_reference.txt')
 openai.api_key = os.environ.get('OPENAI_API_KEY')
 
+# Lowercased wake-word prefixes, punctuated forms first so 'alex:' wins over 'alex'
+_WAKE_PREFIXES = (
+    'alex:', 'alex,', 'alex',
+    'hey assistant:', 'hey assistant,', 'hey assistant',
+    'assistant:', 'assistant,', 'assistant',
+)
+
+
+def _fast_parse(s):
+    # Slicing parse of "%Y-%m-%d %H:%M:%S"; much cheaper than datetime.strptime
+    return datetime(int(s[0:4]), int(s[5:7]), int(s[8:10]),
+                    int(s[11:13]), int(s[14:16]), int(s[17:19]))
+
+
+def _atomic_write(path, data):
+    # Write to a unique temp file and rename over the target so a crash never leaves a half-written file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
 
 class CommandHandler:
+    # path -> (mtime, text); shared so new handlers skip re-reading an unchanged file
+    _cls_cache = {}
+
     def __init__(self, tts_engine=None, mode='command'):
         # for alarm sound
         if not pygame.mixer.get_init():
@@ -23,23 +65,37 @@ class CommandHandler:
         self.music_channel = pygame.mixer.Channel(1)
         pygame.mixer.music.set_volume(0.5)
         self.stop_playlist_flag = threading.Event()
+        # Wakes the playlist worker early on stop/skip instead of it polling the channel
+        self.playlist_wakeup = threading.Event()
         self.tts_engine = tts_engine
         self.mode = mode
         self.active_reminders = {}
         self.timer_counter = 0
+        # Debounced reminder saves: bursts of adds are coalesced into one write
+        self._save_lock = threading.Lock()
+        self._save_pending = None
+        # Held across the whole write so an older snapshot can never replace a newer one
+        self._write_lock = threading.Lock()
         self._reload_scheduled_tasks()
         self._load_reminders()
         self.command_reference = self._load_command_reference()
+        # Byte-identical across calls so the API can reuse its cached prompt prefix
+        self._rag_system_prompt = (
+            "You are a smart home assistant. Convert user requests into smart home commands. "
+            "Ensure you remove any scheduling boilerplate like time expressions and only return the actionable command, "
+            "exactly as shown in the reference. Respond ONLY with the clean command string, no extra commentary. "
+            "Use the following exact command reference as your guide:\n" + self.command_reference
+        )
 
     def _reload_scheduled_tasks(self):
         schedule_file = "scheduled_tasks.json"
         if not os.path.exists(schedule_file):
             return
-        with open(schedule_file, "r") as f:
-            tasks = json.load(f)
+        with open(schedule_file, "rb") as f:
+            tasks = _loads(f.read())
         now = datetime.now()
         for task in tasks:
-            run_at = datetime.strptime(task['run_at'], "%Y-%m-%d %H:%M:%S")
+            run_at = _fast_parse(task['run_at'])
             delay_seconds = (run_at - now).total_seconds()
             if delay_seconds > 0:
                 print(f"Re-scheduling: {task['command']} in {delay_seconds:.0f} seconds")
@@ -54,8 +110,8 @@ class CommandHandler:
     def _load_reminders(self):
         if os.path.exists(REMINDERS_FILE):
             try:
-                with open(REMINDERS_FILE, 'r') as f:
-                    data = json.load(f)
+                with open(REMINDERS_FILE, 'rb') as f:
+                    data = _loads(f.read())
                     self.active_reminders = {int(k): v for k, v in data.items()}
                     if self.active_reminders:
                         self.timer_counter = max(self.active_reminders.keys())
@@ -67,16 +123,38 @@ class CommandHandler:
 
     def _save_reminders(self):
         try:
-            with open(REMINDERS_FILE, 'w') as f:
-                json.dump({str(k): v for k, v in self.active_reminders.items()}, f, indent=2)
+            with self._write_lock:
+                with self._save_lock:
+                    data = _dumps({str(k): v for k, v in self.active_reminders.items()})
+                _atomic_write(REMINDERS_FILE, data)
         except Exception as e:
             print(f"Failed to save reminders: {e}")
 
-    def _load_command_reference(self):
-        if os.path.exists(COMMANDS_REFERENCE_FILE):
+    def _mark_reminders_dirty(self):
+        with self._save_lock:
+            if self._save_pending is None:
+                self._save_pending = threading.Timer(0.5, self._flush_reminders)
+                self._save_pending.start()
+
+    def _flush_reminders(self):
+        with self._save_lock:
+            if self._save_pending is not None:
+                self._save_pending.cancel()
+                self._save_pending = None
+        self._save_reminders()
+
+    @classmethod
+    def _load_command_reference(cls, path=COMMANDS_REFERENCE_FILE):
+        if os.path.exists(path):
             try:
-                with open(COMMANDS_REFERENCE_FILE, 'r') as f:
-                    return f.read()
+                mtime = os.stat(path).st_mtime
+                cached = cls._cls_cache.get(path)
+                if cached and cached[0] == mtime:
+                    return cached[1]
+                with open(path, 'r') as f:
+                    text = f.read()
+                cls._cls_cache[path] = (mtime, text)
+                return text
             except Exception as e:
                 print(f"Failed to load command reference: {e}")
         return ""
@@ -104,21 +182,20 @@ class CommandHandler:
             return "Sorry, there was an internal error while processing your command."
 
     def _strip_wake_word(self, text):
-        pattern = r'^(alex[:,]?|hey assistant[:,]?|assistant[:,]?)(\s*)'
-        return re.sub(pattern, '', text.strip(), flags=re.IGNORECASE)
+        s = text.strip()
+        low = s.lower()
+        for prefix in _WAKE_PREFIXES:
+            if low.startswith(prefix):
+                return s[len(prefix):].lstrip()
+        return s
 
     def _convert_to_command_format(self, text):
-        reference_text = (
-            "You are a smart home assistant. Given a user instruction, rewrite it into a command-ready format. "
-            "Use the following exact command reference as your guide:\n" + self.command_reference +
-            "\nRespond ONLY with the clean command string, no extra commentary. Input: " + text
-        )
         try:
             response = openai.ChatCompletion.create(
                 model="gpt-4",
                 messages=[
-                    {"role": "system", "content": "Convert user requests into smart home commands. Ensure you remove any scheduling boilerplate like time expressions and only return the actionable command, exactly as shown in the reference."},
-                    {"role": "user", "content": reference_text}
+                    {"role": "system", "content": self._rag_system_prompt},
+                    {"role": "user", "content": text}
                 ],
                 max_tokens=100,
                 temperature=0
@@ -147,7 +224,8 @@ class CommandHandler:
             return 'list_reminders', None, text
 
         if txt.startswith('add reminder ') or txt.startswith('set reminder '):
-            reminder_text = txt.replace('add reminder ', '').replace('set reminder ', '').strip()
+            prefix_len = len('add reminder ') if txt.startswith('add reminder ') else len('set reminder ')
+            reminder_text = txt[prefix_len:].strip()
             return 'reminder', (reminder_text,), text
         
         # Strip scheduling boilerplate like time specs
@@ -248,12 +326,13 @@ class CommandHandler:
 
     def _handle_reminder(self, reminder_text):
         cleaned_reminder = self._clean_reminder_text(reminder_text)
-        self.timer_counter += 1
-        self.active_reminders[self.timer_counter] = {
-            'reminder': cleaned_reminder,
-            'timestamp': datetime.now().isoformat()
-        }
-        self._save_reminders()
+        with self._save_lock:
+            self.timer_counter += 1
+            self.active_reminders[self.timer_counter] = {
+                'reminder': cleaned_reminder,
+                'timestamp': datetime.now().isoformat()
+            }
+        self._mark_reminders_dirty()
         return f"Reminder set: {cleaned_reminder}"
 
     def _clean_reminder_text(self, raw_text):
@@ -361,7 +440,8 @@ class CommandHandler:
         
     def _handle_next_song(self):
         if self.music_channel.get_busy():
-            self.music_channel.stop()  # This triggers moving to the next song automatically
+            self.music_channel.stop()
+            self.playlist_wakeup.set()  # Playlist worker moves on to the next track
             return "Skipping to the next song."
         else:
             return "No song is currently playing to skip."
@@ -395,32 +475,55 @@ class CommandHandler:
 
 
         def play_playlist(tracks):
-            for track in tracks:
+            next_sound = self._decode_track(tracks[0])
+            for i, track in enumerate(tracks):
+                sound = next_sound
+                next_track = tracks[i + 1] if i + 1 < len(tracks) else None
                 if self.stop_playlist_flag.is_set():
                     print("Stop flag detected, ending playlist playback.")
                     break
                 try:
+                    if sound is None:
+                        raise RuntimeError("track could not be decoded")
                     print(f"Playing: {track}")
-                    music_sound = pygame.mixer.Sound(track)
-                    self.music_channel.play(music_sound)
-                    while self.music_channel.get_busy():
-                        if self.stop_playlist_flag.is_set():
-                            print("Stop flag detected mid-track, stopping playback.")
-                            self.music_channel.stop()
-                            return
-                        time.sleep(0.1)
+                    self.playlist_wakeup.clear()
+                    self.music_channel.play(sound)
+                    # Taken before decoding the next track so the decode time is not added to the wait
+                    track_end = time.monotonic() + sound.get_length()
                 except Exception as e:
                     print(f"Error playing {track}: {e}")
+                    next_sound = self._decode_track(next_track) if next_track else None
                     continue
 
+                # Decode the following track while this one plays so there is no gap between tracks
+                next_sound = self._decode_track(next_track) if next_track else None
+
+                # Sleep until the track ends; stop/skip set the wakeup event to end the wait early
+                self.playlist_wakeup.wait(max(0.0, track_end - time.monotonic()))
+                if self.stop_playlist_flag.is_set():
+                    print("Stop flag detected mid-track, stopping playback.")
+                    self.music_channel.stop()
+                    return
+                if self.music_channel.get_busy() and self.music_channel.get_sound() is not sound:
+                    print("Music channel taken over, ending playlist playback.")
+                    return
+
         self.stop_playlist_flag.clear()
         threading.Thread(target=play_playlist, args=(track_list,), daemon=True).start()
 
         return f"Shuffling and playing {genre} music."
 
 
+    def _decode_track(self, track):
+        try:
+            return pygame.mixer.Sound(track)
+        except Exception as e:
+            print(f"Error loading {track}: {e}")
+            return None
+
     def _handle_stop_music(self):
         self.stop_playlist_flag.set()
+        self.playlist_wakeup.set()
         if self.music_channel.get_busy():
             self.music_channel.stop()
             return "Music stopped."
@@ -450,6 +553,7 @@ class CommandHandler:
     
     def _handle_schedule(self, schedule_text, original_text=None):
         print(f"Scheduling task: {schedule_text}")
+        now = datetime.now()
 
         # Try to extract delay (e.g., "in 30 seconds")
         delay_match = re.search(r'in (\d+)\s*(seconds|second|minutes|minute|min)', schedule_text)
@@ -468,7 +572,6 @@ class CommandHandler:
         elif time_match:
             time_str = time_match.group(1)
             am_pm = time_match.group(2)
-            now = datetime.now()
 
 
             # Parse the time (e.g., 3:30 or 15:30)
@@ -488,7 +591,7 @@ class CommandHandler:
             threading.Thread(target=self._schedule_after_delay, args=(delay_seconds, schedule_text), daemon=True).start()
 
             # Save schedule to file
-            schedule_entry = {"command": schedule_text, "run_at": (datetime.now() + timedelta(seconds=delay_seconds)).strftime("%Y-%m-%d %H:%M:%S")}
+            schedule_entry = {"command": schedule_text, "run_at": (now + timedelta(seconds=delay_seconds)).strftime("%Y-%m-%d %H:%M:%S")}
             self._save_scheduled_task(schedule_entry)
 
             return f"Task scheduled to run at {scheduled_time.strftime('%H:%M')}."
@@ -500,13 +603,12 @@ class CommandHandler:
         schedule_file = "scheduled_tasks.json"
         try:
             if os.path.exists(schedule_file):
-                with open(schedule_file, "r") as f:
-                    data = json.load(f)
+                with open(schedule_file, "rb") as f:
+                    data = _loads(f.read())
             else:
                 data = []
             data.append(task)
-            with open(schedule_file, "w") as f:
-                json.dump(data, f, indent=4)
+            _atomic_write(schedule_file, _dumps(data))
         except Exception as e:
             print(f"Failed to save scheduled task: {e}")
 
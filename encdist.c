@@ -0,0 +1,63 @@
+/* Squared L2 distances from one 128-d face encoding to N known encodings (AVX2 + FMA).
+ * Optional: video_processor.py loads encdist.so / encdist.dll through ctypes when present
+ * and falls back to numpy otherwise. Build instructions are in the README. */
+#include <stddef.h>
+#include <immintrin.h>
+
+#ifdef _WIN32
+#define EXPORT __declspec(dllexport)
+#else
+#define EXPORT
+#endif
+
+#define DIM 128
+
+static inline float hsum256(__m256 v)
+{
+    __m128 lo = _mm256_castps256_ps128(v);
+    __m128 hi = _mm256_extractf128_ps(v, 1);
+    lo = _mm_add_ps(lo, hi);
+    lo = _mm_add_ps(lo, _mm_movehl_ps(lo, lo));
+    lo = _mm_add_ss(lo, _mm_movehdup_ps(lo));
+    return _mm_cvtss_f32(lo);
+}
+
+/* Q: one query (DIM floats), K: N x DIM row-major, out: N squared distances */
+EXPORT void l2_scan(const float *Q, const float *K, int N, float *out)
+{
+    __m256 q[DIM / 8];
+    for (int d = 0; d < DIM / 8; d++)
+        q[d] = _mm256_loadu_ps(Q + 8 * d);
+
+    int i = 0;
+    /* Four known encodings per pass so every query load is reused four times */
+    for (; i + 4 <= N; i += 4) {
+        const float *k0 = K + (size_t)i * DIM;
+        const float *k1 = k0 + DIM, *k2 = k1 + DIM, *k3 = k2 + DIM;
+        __m256 a0 = _mm256_setzero_ps(), a1 = _mm256_setzero_ps();
+        __m256 a2 = _mm256_setzero_ps(), a3 = _mm256_setzero_ps();
+        for (int d = 0; d < DIM / 8; d++) {
+            __m256 t0 = _mm256_sub_ps(q[d], _mm256_loadu_ps(k0 + 8 * d));
+            __m256 t1 = _mm256_sub_ps(q[d], _mm256_loadu_ps(k1 + 8 * d));
+            __m256 t2 = _mm256_sub_ps(q[d], _mm256_loadu_ps(k2 + 8 * d));
+            __m256 t3 = _mm256_sub_ps(q[d], _mm256_loadu_ps(k3 + 8 * d));
+            a0 = _mm256_fmadd_ps(t0, t0, a0);
+            a1 = _mm256_fmadd_ps(t1, t1, a1);
+            a2 = _mm256_fmadd_ps(t2, t2, a2);
+            a3 = _mm256_fmadd_ps(t3, t3, a3);
+        }
+        out[i] = hsum256(a0);
+        out[i + 1] = hsum256(a1);
+        out[i + 2] = hsum256(a2);
+        out[i + 3] = hsum256(a3);
+    }
+    for (; i < N; i++) {
+        const float *k = K + (size_t)i * DIM;
+        __m256 a = _mm256_setzero_ps();
+        for (int d = 0; d < DIM / 8; d++) {
+            __m256 t = _mm256_sub_ps(q[d], _mm256_loadu_ps(k + 8 * d));
+            a = _mm256_fmadd_ps(t, t, a);
+        }
+        out[i] = hsum256(a);
+    }
+}
@@ -4,9 +4,33 @@ import os
 import time
 import sys
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
 def purge_port(port):
     """Kill any process currently using the specified UDP port"""
     print(f"Purging processes on UDP port {port}...")
+    if psutil is None:
+        _purge_port_shell(port)
+        return
+    # One in-process scan of the socket table; no netstat/lsof/kill subprocesses
+    try:
+        connections = psutil.net_connections(kind='udp')
+    except psutil.AccessDenied:
+        _purge_port_shell(port)
+        return
+    for conn in connections:
+        if conn.laddr and conn.laddr.port == port and conn.pid and conn.pid != os.getpid():
+            try:
+                psutil.Process(conn.pid).kill()
+                print(f"Killed PID {conn.pid} on UDP port {port}")
+            except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
+                print(f"Could not kill PID {conn.pid} on UDP port {port}: {e}")
+
+def _purge_port_shell(port):
+    """Fallback for purge_port when psutil is unavailable or not permitted"""
     if os.name == 'nt':  # Windows
         try:
             output = subprocess.check_output(
@@ -31,14 +55,17 @@ def purge_port(port):
         except subprocess.CalledProcessError:
             pass
 
-def stream_via_ffmpeg(port, width, height):
+def stream_via_ffmpeg(port, width, height, input_args=None):
     """
     Spawn system FFmpeg to read UDP video stream and pipe raw frames to Python.
-    Returns subprocess and reader generator.
+    Returns subprocess and reader generator. Yielded frames are read-only views;
+    copy before drawing on them. `input_args` are extra FFmpeg options placed
+    before the input (e.g. low-latency flags).
     """
     url = f"udp://0.0.0.0:{port}?fifo_size=10000000&overrun_nonfatal=1"
     cmd = [
         'ffmpeg',
+        *(input_args or []),
         '-i', url,
         '-f', 'rawvideo',
         '-pix_fmt', 'bgr24',
@@ -59,7 +86,8 @@ def stream_via_ffmpeg(port, width, height):
             raw = p.stdout.read(frame_size)
             if len(raw) < frame_size:
                 break
-            frame = np.frombuffer(raw, np.uint8).reshape((height, width, 3)).copy()
+            # Zero-copy view over the bytes read from the pipe; frames are read-only
+            frame = np.frombuffer(raw, np.uint8).reshape((height, width, 3))
             yield frame
     
     return p, reader()
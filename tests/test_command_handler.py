@@ -1,6 +1,7 @@
-import os, json, tempfile
+import os, re, json, tempfile
+from datetime import datetime
 import pytest
-from command_handler import CommandHandler, REMINDERS_FILE
+from command_handler import CommandHandler, REMINDERS_FILE, _fast_parse
 
 class DummyTTS:
     def speak(self, text): pass
@@ -24,6 +25,8 @@ def test_reminder_and_listing():
     # add reminder
     resp = h.execute_command('reminder', ("walk dog at 6pm",), "walk dog at 6pm")
     assert "walk dog" in resp.lower()
+    # saves are debounced; flush before checking the file
+    h._flush_reminders()
     # file should exist
     data = json.loads(open(REMINDERS_FILE).read())
     assert any("walk dog" in v['text'] for v in data.values())
@@ -40,3 +43,58 @@ def test_parse_command_variants(input_text, expected_type):
     h = CommandHandler(DummyTTS())
     cmd_type, args, raw = h.parse_command(input_text)
     assert cmd_type == expected_type
+
+# The regex _strip_wake_word replaced; the prefix scan must agree with it
+_OLD_WAKE_RE = r'^(alex[:,]?|hey assistant[:,]?|assistant[:,]?)(\s*)'
+
+@pytest.mark.parametrize("text,expected", [
+    ("alex: turn on the lights", "turn on the lights"),
+    ("Hey Assistant, what time is it", "what time is it"),
+    ("assistant play jazz", "play jazz"),
+    ("  ALEX   set a timer  ", "set a timer"),
+    ("hey assistant:", ""),
+    ("alexa play music", "a play music"),
+    ("what is the date", "what is the date"),
+    ("tell alex a joke", "tell alex a joke"),
+])
+def test_strip_wake_word(text, expected):
+    h = CommandHandler(DummyTTS())
+    assert h._strip_wake_word(text) == expected
+    assert h._strip_wake_word(text) == re.sub(_OLD_WAKE_RE, '', text.strip(), flags=re.IGNORECASE)
+
+@pytest.mark.parametrize("stamp", [
+    "2025-01-01 00:00:00",
+    "2025-06-15 08:05:09",
+    "2024-02-29 23:59:59",
+    datetime(2031, 12, 31, 12, 30, 45).strftime("%Y-%m-%d %H:%M:%S"),
+])
+def test_fast_parse_matches_strptime(stamp):
+    parsed = _fast_parse(stamp)
+    assert parsed == datetime.strptime(stamp, "%Y-%m-%d %H:%M:%S")
+    assert parsed.strftime("%Y-%m-%d %H:%M:%S") == stamp
+
+def test_flush_writes_reminders_atomically(tmp_path, monkeypatch):
+    path = str(tmp_path / "reminders.json")
+    monkeypatch.setattr("command_handler.REMINDERS_FILE", path)
+    replaced = []
+    real_replace = os.replace
+    monkeypatch.setattr(os, "replace",
+                        lambda src, dst: (replaced.append((src, dst)), real_replace(src, dst)))
+
+    h = CommandHandler(DummyTTS())
+    replaced.clear()
+    h.active_reminders = {1: {'text': 'walk dog', 'timestamp': '2025-01-01T18:00:00'}}
+    # Two marks inside the debounce window coalesce into one pending save
+    h._mark_reminders_dirty()
+    pending = h._save_pending
+    h._mark_reminders_dirty()
+    assert h._save_pending is pending
+
+    h._flush_reminders()
+    assert h._save_pending is None
+    # Written through a temp file in the same directory, then renamed over the target
+    assert len(replaced) == 1
+    src, dst = replaced[0]
+    assert dst == path and os.path.dirname(src) == str(tmp_path)
+    assert os.listdir(tmp_path) == ["reminders.json"]
+    assert json.loads(open(path).read()) == {'1': {'text': 'walk dog', 'timestamp': '2025-01-01T18:00:00'}}
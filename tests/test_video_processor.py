@@ -0,0 +1,83 @@
+from collections import Counter
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("pygame")
+import video_processor
+from video_processor import FaceRecognizer
+
+TOLERANCE = 0.6
+
+def _recognizer(known, names, **config):
+    # Only the matching state is needed; skip __init__ (models, pygame, threads)
+    r = FaceRecognizer.__new__(FaceRecognizer)
+    r.config = config
+    r.known_matrix = known
+    r.known_sq = np.einsum('ij,ij->i', known, known).astype(np.float32)
+    r.unique_names, r.name_idx = np.unique(np.asarray(names, dtype=str), return_inverse=True)
+    r._quantize_encodings()
+    r._build_ann_index()
+    return r
+
+def _reference(known, names, q):
+    # face_recognition.compare_faces plus a majority vote; ties go to the alphabetically first name
+    hits = np.linalg.norm(known - q, axis=1) <= TOLERANCE
+    votes = Counter(n for n, hit in zip(names, hits) if hit)
+    return max(sorted(votes), key=votes.get) if votes else 'Unknown'
+
+@pytest.fixture
+def faces():
+    rng = np.random.default_rng(0)
+    people = ['carol', 'alice', 'bob']
+    centers = rng.normal(0, 0.1, (len(people), 128))
+    known = np.concatenate([c + rng.normal(0, 0.02, (4, 128)) for c in centers]).astype(np.float32)
+    names = [p for p in people for _ in range(4)]
+    queries = np.concatenate([
+        centers + rng.normal(0, 0.02, centers.shape),
+        rng.normal(0, 0.1, (2, 128)),
+    ]).astype(np.float32)
+    return known, names, queries
+
+def _paths():
+    yield pytest.param({}, dict(_compare_and_vote=None, _l2_scan=None), id="numpy")
+    yield pytest.param({}, dict(_l2_scan=None), id="numba",
+                       marks=pytest.mark.skipif(video_processor._compare_and_vote is None, reason="numba not installed"))
+    yield pytest.param({}, {}, id="l2_scan",
+                       marks=pytest.mark.skipif(video_processor._l2_scan is None, reason="encdist not built"))
+    yield pytest.param({'ENCODING_DTYPE': 'int8'}, dict(simsimd=None, _int8_sq_distances=None), id="int8-numpy")
+    yield pytest.param({'ENCODING_DTYPE': 'int8'}, dict(simsimd=None), id="int8-numba",
+                       marks=pytest.mark.skipif(video_processor._int8_sq_distances is None, reason="numba not installed"))
+    yield pytest.param({'ENCODING_DTYPE': 'int8'}, {}, id="int8-simsimd",
+                       marks=pytest.mark.skipif(video_processor.simsimd is None, reason="simsimd not installed"))
+    yield pytest.param({'ANN_MIN_ENCODINGS': 1}, {}, id="hnsw",
+                       marks=pytest.mark.skipif(video_processor.hnswlib is None, reason="hnswlib not installed"))
+    yield pytest.param({'ANN_MIN_ENCODINGS': 1, 'ANN_BACKEND': 'faiss'}, {}, id="faiss",
+                       marks=pytest.mark.skipif(video_processor.faiss is None, reason="faiss not installed"))
+
+@pytest.mark.parametrize("config,patches", _paths())
+def test_recognize_batch_matches_reference(faces, config, patches, monkeypatch):
+    for attr, value in patches.items():
+        monkeypatch.setattr(video_processor, attr, value)
+    known, names, queries = faces
+    r = _recognizer(known, names, **config)
+    expected = [_reference(known, names, q) for q in queries]
+    assert expected[:3] == ['carol', 'alice', 'bob'] and expected[3:] == ['Unknown', 'Unknown']
+    assert r._recognize_batch(queries, TOLERANCE) == expected
+
+def test_compare_faces_matches_norm(faces, monkeypatch):
+    monkeypatch.setattr(video_processor, "_l2_scan", None)
+    known, names, queries = faces
+    r = _recognizer(known, names)
+    expected = np.linalg.norm(known[None, :, :] - queries[:, None, :], axis=2) <= TOLERANCE
+    assert (r._face_recognition_compare_faces(queries, TOLERANCE) == expected).all()
+
+def test_vote_tie_goes_to_alphabetically_first_name(monkeypatch):
+    # The pre-batching code picked the first name it met in the encodings file; the
+    # bincount vote (and the numba kernel) pick the alphabetically first instead
+    monkeypatch.setattr(video_processor, "_l2_scan", None)
+    known = np.zeros((2, 128), dtype=np.float32)
+    known[:, 0] = [0.1, -0.1]
+    r = _recognizer(known, ['zoe', 'adam'])
+    assert r._recognize_batch(np.zeros((1, 128), dtype=np.float32), TOLERANCE) == ['adam']
+    assert r._vote_names(np.array([0, 0]), np.array([0, 1]), 1) == ['adam']
@@ -1,11 +1,11 @@
 import os
-import tempfile
+import hashlib
 import pygame
 import openai
 import subprocess
+import tempfile
 import time
 import requests
-import errno
 
 class TextToSpeech:
     def __init__(self, config):
@@ -14,6 +14,15 @@ class TextToSpeech:
         # Using OpenAI v0.28.0 syntax
         openai.api_key = os.environ.get('OPENAI_API_KEY')
         pygame.mixer.init()
+        # Short generated clips are kept on disk so repeated phrases skip the API entirely.
+        # Longer text (one-off replies) is never stored, and the cache keeps at most
+        # TTS_CACHE_MAX_FILES clips, least recently played evicted first.
+        self.cache_dir = config.get('TTS_CACHE_DIR', 'tts_cache')
+        self.cache_max_chars = config.get('TTS_CACHE_MAX_CHARS', 80)
+        self.cache_max_files = config.get('TTS_CACHE_MAX_FILES', 200)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Keep-alive session reuses the TLS connection across cache misses
+        self._session = requests.Session()
         
     def speak(self, text):
         """Convert text to speech and play it"""
@@ -22,65 +31,126 @@ class TextToSpeech:
             return
             
         print(f"Converting to speech: {text}")
-        
-        # Create temporary file for the audio
-        with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as tmp_file:
-            temp_filename = tmp_file.name
-        
+
+        voice = self.config.get('TTS_VOICE', 'alloy')
+        key = hashlib.blake2b(f"{voice}|{text}".encode(), digest_size=16).hexdigest()
+        cache_path = os.path.join(self.cache_dir, f"{key}.mp3")
+
         try:
-            # Generate speech using OpenAI API with v0.28.0 syntax
-            # Direct API call for v0.28.0
-            headers = {
-                "Authorization": f"Bearer {openai.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": "tts-1",
-                "voice": self.config.get('TTS_VOICE', 'alloy'),
-                "input": text
-            }
-            
-            response = requests.post(
-                "https://api.openai.com/v1/audio/speech",
-                headers=headers,
-                json=data
-            )
-            
-            if response.status_code == 200:
-                # Save speech to file
-                with open(temp_filename, 'wb') as f:
-                    f.write(response.content)
-                
-                # Play the audio
-                print("Playing TTS audio")
-                pygame.mixer.music.load(temp_filename)
-                pygame.mixer.music.play()
-                while pygame.mixer.music.get_busy():
-                    time.sleep(0.1)
+            if os.path.exists(cache_path):
+                print("Using cached TTS audio")
+                # Bump the mtime so eviction treats the clip as recently used
+                os.utime(cache_path)
+                self._play_file(cache_path)
             else:
-                print(f"Error generating speech: {response.status_code} - {response.text}")
-                
+                # Generate speech using OpenAI API with v0.28.0 syntax
+                # Direct API call for v0.28.0
+                headers = {
+                    "Authorization": f"Bearer {openai.api_key}",
+                    "Content-Type": "application/json"
+                }
+
+                data = {
+                    "model": "tts-1",
+                    "voice": voice,
+                    "input": text
+                }
+
+                response = self._session.post(
+                    "https://api.openai.com/v1/audio/speech",
+                    headers=headers,
+                    json=data,
+                    stream=True
+                )
+
+                if response.status_code != 200:
+                    print(f"Error generating speech: {response.status_code} - {response.text}")
+                    return
+
+                self._stream_and_cache(response, cache_path, keep=len(text) <= self.cache_max_chars)
+
         except Exception as e:
             print(f"Error generating speech: {e}")
-            
-        finally:
-            # Clean up temporary file safely
-            if os.path.exists(temp_filename):
-                for attempt in range(5):
+
+    def _play_file(self, path):
+        # The clip is decoded into memory so we can wait its exact length instead of polling the mixer
+        print("Playing TTS audio")
+        sound = pygame.mixer.Sound(path)
+        sound.play()
+        time.sleep(sound.get_length())
+
+    def _stream_and_cache(self, response, cache_path, keep=True):
+        """Play the response while it downloads, saving it to the cache as it arrives.
+        With keep=False nothing is written to disk unless ffplay is missing."""
+        try:
+            player = subprocess.Popen(
+                ['ffplay', '-nodisp', '-autoexit', '-loglevel', 'quiet', '-'],
+                stdin=subprocess.PIPE
+            )
+        except FileNotFoundError:
+            player = None
+            print("ffplay not found, downloading TTS audio before playback")
+        else:
+            print("Streaming TTS audio")
+
+        # Unique scratch file so concurrent speakers never share one, and a failed
+        # download never leaves a truncated cache entry
+        f = tmp_path = None
+        if keep or player is None:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.part')
+            f = os.fdopen(fd, 'wb')
+        try:
+            for chunk in response.iter_content(chunk_size=4096):
+                if f:
+                    f.write(chunk)
+                if player:
                     try:
-                        os.unlink(temp_filename)
-                        print(f"Temporary TTS file {temp_filename} deleted successfully.")
-                        break
-                    except OSError as e:
-                        if e.errno == errno.EACCES:
-                            print(f"TTS temp file still in use (attempt {attempt+1}/5), retrying...")
-                            time.sleep(0.5)
-                        else:
-                            print(f"Unexpected error deleting temp file: {e}")
-                            break
-                else:
-                    print(f"Warning: Failed to delete TTS temp file after retries: {temp_filename}")
+                        player.stdin.write(chunk)
+                    except OSError:
+                        # BrokenPipeError, or EINVAL on Windows, once ffplay has gone away
+                        player.kill()
+                        player.wait()
+                        player = None
+            if f:
+                f.close()
+                f = None
+
+            play_path = tmp_path
+            if keep:
+                os.replace(tmp_path, cache_path)
+                tmp_path = None
+                play_path = cache_path
+                self._prune_cache()
+
+            if player:
+                player.stdin.close()
+                player.wait()
+                player = None
+            elif play_path:
+                self._play_file(play_path)
+        finally:
+            if f:
+                f.close()
+            if player:
+                player.kill()
+                player.wait()
+            if tmp_path:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def _prune_cache(self):
+        # Oldest mtime first; a cache hit refreshes its clip's mtime
+        clips = [e for e in os.scandir(self.cache_dir) if e.name.endswith('.mp3')]
+        if len(clips) <= self.cache_max_files:
+            return
+        clips.sort(key=lambda e: e.stat().st_mtime)
+        for entry in clips[:len(clips) - self.cache_max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
 
 
 if __name__ == "__main__":
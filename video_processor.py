@@ -1,15 +1,117 @@
 import cv2
+import ctypes
 import numpy as np
 import pickle
-import datetime
 import os
 import pygame
 import time
 import threading
 import queue
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from network_utils import stream_via_ffmpeg
 
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    import xxhash
+    _fingerprint = xxhash.xxh3_64_intdigest
+except ImportError:
+    _fingerprint = hash
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    _compare_and_vote = None
+    _int8_sq_distances = None
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True, parallel=True)
+    def _compare_and_vote(known, known_sq, queries, name_idx, n_names, tol):
+        """Squared-L2 match of each of the M query encodings against all known ones, then a
+        name vote per query. Returns (M,) winning indices into unique_names, -1 for no match."""
+        m, dim = queries.shape
+        n = known.shape[0]
+        tol_sq = tol * tol
+        best = np.full(m, -1, dtype=np.int32)
+        hits = np.empty(n, dtype=np.bool_)
+        votes = np.empty(n_names, dtype=np.int32)
+        for j in range(m):
+            q_sq = 0.0
+            for k in range(dim):
+                q_sq += queries[j, k] * queries[j, k]
+            # A frame has only a few faces, so the parallelism goes over the known encodings
+            for i in prange(n):
+                # |q - k|^2 from the precomputed |k|^2: one multiply-add per element
+                dot = 0.0
+                for k in range(dim):
+                    dot += known[i, k] * queries[j, k]
+                hits[i] = q_sq + known_sq[i] - 2.0 * dot <= tol_sq
+            # Votes are tallied serially; a parallel increment would race
+            votes[:] = 0
+            for i in range(n):
+                if hits[i]:
+                    votes[name_idx[i]] += 1
+            best_votes = 0
+            for u in range(n_names):
+                if votes[u] > best_votes:
+                    best[j] = u
+                    best_votes = votes[u]
+        return best
+
+    @njit(cache=True, fastmath=True, parallel=True)
+    def _int8_sq_distances(queries, known, known_sq):
+        """(M, N) squared distances between int8 encodings, accumulated in int32"""
+        m, dim = queries.shape
+        n = known.shape[0]
+        out = np.empty((m, n), dtype=np.int32)
+        for j in range(m):
+            q_sq = np.int32(0)
+            for k in range(dim):
+                q_sq += np.int32(queries[j, k]) * np.int32(queries[j, k])
+            for i in prange(n):
+                dot = np.int32(0)
+                for k in range(dim):
+                    dot += np.int32(known[i, k]) * np.int32(queries[j, k])
+                out[j, i] = q_sq + known_sq[i] - 2 * dot
+        return out
+
+
+def _load_encdist():
+    # Optional AVX2 distance kernel built from encdist.c (see README); numpy is used without it
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in ('encdist.so', 'encdist.dll'):
+        path = os.path.join(here, name)
+        if not os.path.exists(path):
+            continue
+        try:
+            fn = ctypes.CDLL(path).l2_scan
+        except (OSError, AttributeError) as e:
+            print(f"Could not load {name} ({e}), using numpy distances.")
+            return None
+        fn.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p]
+        fn.restype = None
+        return fn
+    return None
+
+
+_l2_scan = _load_encdist()
+
+
 class FaceRecognizer:
     def __init__(self, config):
         self.config = config
@@ -20,29 +122,232 @@ class FaceRecognizer:
         if not os.path.isfile(proto_path) or not os.path.isfile(model_path):
             raise FileNotFoundError(f"DNN model files not found. Expected: {proto_path}, {model_path}")
 
+        # Detection and recognition run concurrently; capping OpenCV's own thread pool
+        # (CV_NUM_THREADS) stops the two stages oversubscribing the cores
+        if config.get('CV_NUM_THREADS') is not None:
+            cv2.setNumThreads(config['CV_NUM_THREADS'])
+
         self.face_net = cv2.dnn.readNetFromCaffe(proto_path, model_path)
-        self.face_net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
-        self.face_net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
-        print("Using CPU backend for face detection to ensure consistent performance.")
+        self._configure_dnn_backend()
 
         self.last_seen = {}
         self.detection_streak = defaultdict(int)
         self.load_encodings()
         pygame.mixer.init()
+        self._welcomes = self._load_welcome_sounds()
         self.recognition_callback = None
 
-        self.frame_queue = queue.Queue(maxsize=5)
+        # Only the newest decoded frame is kept; the reader evicts older ones
+        self.frame_queue = queue.Queue(maxsize=1)
+        # Detector stage output: (frame, boxes, static), newest wins when recognition falls behind
+        self.det_queue = queue.Queue(maxsize=2)
+        # Frames ready to show; only the newest is kept
+        self.display_q = queue.Queue(maxsize=1)
         self.stop_event = threading.Event()
+        # Welcome messages play one at a time on a dedicated audio thread, never on the
+        # recognition thread; the small bounded queue drops requests rather than piling up
+        self.audio_q = queue.Queue(maxsize=2)
+        threading.Thread(target=self._audio_worker, daemon=True).start()
+
+        # Per-frame scratch buffer, (re)allocated only when the frame size changes
+        self._rgb_buf = None
+        # Detector input and blob are always 300x300, filled in place instead of a fresh blobFromImage allocation
+        self._det_input = np.empty((300, 300, 3), dtype=np.uint8)
+        self._blob_buf = np.empty((1, 3, 300, 300), dtype=np.float32)
+        self._blob_mean = np.array([104.0, 177.0, 123.0], dtype=np.float32).reshape(3, 1, 1)
+        self._enc_scratch = np.empty((config.get('MAX_FACES', 16), 128), dtype=np.float32)
+        self._encoding_batch_size = max(1, config.get('ENCODING_BATCH_SIZE', 16))
+        self._face_encoder = None
+
+        self._detect_every = max(1, config.get('DETECT_EVERY_N_FRAMES', 2))
+        self._frame_index = 0
+        self._last_boxes = None
+        self._last_frame_hash = None
+        self._prev_small = None
+        self._motion_eps = config.get('MOTION_EPS', 2.0)
+        # MOTION_DETECTOR: 'mog2' (running background model) or 'diff' (consecutive thumbnails)
+        self._bg = None
+        if config.get('MOTION_DETECTOR', 'mog2') == 'mog2':
+            self._bg = cv2.createBackgroundSubtractorMOG2(history=100, varThreshold=25, detectShadows=False)
+        self._motion_min_pixels = config.get('MOTION_MIN_PIXELS', 50)
+        # Static frames reuse the last display frame; detection is forced after IDLE_REFRESH_FRAMES
+        self._idle_refresh = max(1, config.get('IDLE_REFRESH_FRAMES', 30))
+        self._since_detect = 0
+        self._last_display = None
+        # OPENCL_PREPROCESS uploads each frame once as a cv2.UMat so the detector and
+        # motion thumbnails are resized on the GPU; defaults on with DNN_BACKEND='opencl'
+        self._use_umat = (config.get('OPENCL_PREPROCESS', config.get('DNN_BACKEND') == 'opencl')
+                          and cv2.ocl.haveOpenCL())
+        if self._use_umat:
+            cv2.ocl.setUseOpenCL(True)
+
+        # Quantized box -> (name, expiry in recognition frames), see _names_for_boxes
+        self._tracked = {}
+        # LRU of (16px grid cell, face-crop hash) -> (encoding, expiry in recognition frames),
+        # see _encodings_for; ENCODING_CACHE_SIZE=0 disables
+        self._enc_cache = OrderedDict()
+        self._enc_cache_size = config.get('ENCODING_CACHE_SIZE', 128)
+        self._enc_cache_ttl = config.get('ENCODING_CACHE_TTL_FRAMES', 30)
+        self._track_ttl = config.get('TRACK_TTL_FRAMES', 15)
+        self._recog_index = 0
+        # Name -> pre-rendered label patch, see _draw_overlay
+        self._label_cache = {}
+
+    def _configure_dnn_backend(self):
+        # DNN_BACKEND: 'auto' (CUDA if present, else CPU), 'cuda', 'opencl' or 'cpu'.
+        # GPU targets run in FP16 unless DNN_FP16 is False; the model weights are FP16 already.
+        backend = self.config.get('DNN_BACKEND', 'auto')
+        fp16 = self.config.get('DNN_FP16', True)
+
+        if backend in ('auto', 'cuda'):
+            try:
+                if cv2.cuda.getCudaEnabledDeviceCount() > 0:
+                    self.face_net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+                    self.face_net.setPreferableTarget(
+                        cv2.dnn.DNN_TARGET_CUDA_FP16 if fp16 else cv2.dnn.DNN_TARGET_CUDA
+                    )
+                    print(f"Using CUDA backend for face detection ({'FP16' if fp16 else 'FP32'}).")
+                    return
+                if backend == 'cuda':
+                    print("No CUDA device found, falling back to CPU for face detection.")
+            except (AttributeError, cv2.error) as e:
+                if backend == 'cuda':
+                    print(f"CUDA backend unavailable ({e}), falling back to CPU for face detection.")
+
+        elif backend == 'opencl':
+            if cv2.ocl.haveOpenCL():
+                cv2.ocl.setUseOpenCL(True)
+                self.face_net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+                self.face_net.setPreferableTarget(
+                    cv2.dnn.DNN_TARGET_OPENCL_FP16 if fp16 else cv2.dnn.DNN_TARGET_OPENCL
+                )
+                print(f"Using OpenCL target for face detection ({'FP16' if fp16 else 'FP32'}).")
+                return
+            print("OpenCL not available, falling back to CPU for face detection.")
+
+        self.face_net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.face_net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        print("Using CPU backend for face detection to ensure consistent performance.")
 
     def load_encodings(self):
-        print(f"Loading face encodings from {self.config['ENCODINGS_FILE']}")
+        # The pickle is converted once to raw .npy files next to it, which are then
+        # memory-mapped: startup no longer unpickles every encoding onto the Python heap,
+        # and separate processes share the same read-only pages
+        pickle_path = self.config['ENCODINGS_FILE']
+        base = os.path.splitext(pickle_path)[0]
+        enc_path, names_path = f"{base}.npy", f"{base}_names.npy"
+        self._convert_encodings(pickle_path, enc_path, names_path)
+
+        print(f"Loading face encodings from {enc_path}")
         try:
-            with open(self.config['ENCODINGS_FILE'], 'rb') as f:
-                self.data = pickle.load(f)
-            print(f"Loaded {len(self.data['encodings'])} face encodings")
+            # np.save pads its header to 64 bytes, so the mapped rows stay 32-byte aligned
+            self.known_matrix = np.load(enc_path, mmap_mode='r')
+            names = np.load(names_path)
+            print(f"Loaded {len(self.known_matrix)} face encodings")
         except FileNotFoundError:
-            print(f"Error: Encodings file {self.config['ENCODINGS_FILE']} not found")
-            self.data = {"encodings": [], "names": []}
+            print(f"Error: Encodings file {pickle_path} not found")
+            self.known_matrix = np.empty((0, 128), np.float32)
+            names = np.empty(0, dtype=str)
+
+        # Squared norms of the known encodings, reused by every distance computation
+        self.known_sq = np.einsum('ij,ij->i', self.known_matrix, self.known_matrix).astype(np.float32)
+        # Each known encoding's name as an index into unique_names, for bincount voting
+        self.unique_names, self.name_idx = np.unique(names, return_inverse=True)
+        self._quantize_encodings()
+        self._build_ann_index()
+
+    def _convert_encodings(self, pickle_path, enc_path, names_path):
+        """Write the pickle's encodings/names as .npy files if they are missing or older"""
+        try:
+            pickle_mtime = os.path.getmtime(pickle_path)
+        except OSError:
+            return
+        if os.path.exists(enc_path) and os.path.exists(names_path) \
+                and min(os.path.getmtime(enc_path), os.path.getmtime(names_path)) >= pickle_mtime:
+            return
+
+        print(f"Converting {pickle_path} to {enc_path}")
+        with open(pickle_path, 'rb') as f:
+            data = pickle.load(f)
+        # Rows are copied straight into float32, narrowing dlib's float64 output
+        matrix = np.empty((len(data['encodings']), 128), dtype=np.float32)
+        for i, enc in enumerate(data['encodings']):
+            matrix[i] = enc
+        for path, arr in ((enc_path, matrix), (names_path, np.asarray(data['names'], dtype=str))):
+            tmp = f"{path}.tmp"
+            with open(tmp, 'wb') as f:
+                np.save(f, arr)
+            os.replace(tmp, path)
+
+    def _quantize_encodings(self):
+        # Optional int8 copy of the known encodings: 4x less memory traffic per scan.
+        # simsimd dispatches int8 distances to VNNI where the CPU has it; otherwise a
+        # Numba (or plain numpy) int32-accumulating kernel is used
+        self.known_i8 = None
+        if self.config.get('ENCODING_DTYPE', 'float32') != 'int8' or not len(self.known_matrix):
+            return
+        # One global scale keeps Euclidean distances proportional, so the tolerance still applies
+        self.i8_scale = float(np.abs(self.known_matrix).max()) / 127 or 1.0
+        self.known_i8 = self._to_int8(self.known_matrix)
+        self.known_i8_sq = np.einsum('ij,ij->i', self.known_i8, self.known_i8, dtype=np.int32)
+        print(f"Quantized {len(self.known_i8)} face encodings to int8")
+
+    def _int8_distances(self, queries_i8):
+        if simsimd is not None:
+            return np.asarray(simsimd.cdist(queries_i8, self.known_i8, metric="sqeuclidean"))
+        if _int8_sq_distances is not None:
+            return _int8_sq_distances(queries_i8, self.known_i8, self.known_i8_sq)
+        q = queries_i8.astype(np.int32)
+        return (q * q).sum(axis=1)[:, None] + self.known_i8_sq[None, :] - 2 * (q @ self.known_i8.T.astype(np.int32))
+
+    def _build_ann_index(self):
+        # Linear scans are fine for a household; past ANN_MIN_ENCODINGS known faces an
+        # index gives roughly logarithmic lookups instead. ANN_BACKEND picks hnswlib or FAISS.
+        self.ann_index = None
+        n = len(self.known_matrix)
+        if n < self.config.get('ANN_MIN_ENCODINGS', 100):
+            return
+        dim = self.known_matrix.shape[1]
+        backend = self.config.get('ANN_BACKEND', 'hnsw')
+
+        if backend == 'faiss':
+            if faiss is None:
+                print("faiss not installed, using linear scan over face encodings")
+                return
+            # Exact flat search until the set is big enough for a graph index to pay off
+            if n >= self.config.get('FAISS_HNSW_MIN_ENCODINGS', 10000):
+                index = faiss.IndexHNSWFlat(dim, 32)
+            else:
+                index = faiss.IndexFlatL2(dim)
+            index.add(self.known_matrix)
+            self.ann_index = index
+            self._ann_backend = 'faiss'
+            print(f"Built FAISS {type(index).__name__} over {n} face encodings")
+            return
+
+        if hnswlib is None:
+            print("hnswlib not installed, using linear scan over face encodings")
+            return
+        # 'l2' space reports squared Euclidean distance, so the usual tolerance carries over
+        index = hnswlib.Index(space='l2', dim=dim)
+        index.init_index(max_elements=n, ef_construction=200, M=16)
+        index.add_items(self.known_matrix, np.arange(n))
+        index.set_ef(50)
+        self.ann_index = index
+        self._ann_backend = 'hnsw'
+        print(f"Built HNSW index over {n} face encodings")
+
+    def _ann_query(self, encodings, k):
+        """(labels, squared distances) of the k nearest known encodings, each shaped (M, k)"""
+        if self._ann_backend == 'faiss':
+            # FAISS L2 indexes also report squared distances; missing neighbours come back
+            # as label -1 with a huge distance, so the tolerance filter drops them
+            d2, labels = self.ann_index.search(np.ascontiguousarray(encodings, dtype=np.float32), k)
+            return labels, d2
+        return self.ann_index.knn_query(encodings, k=k)
+
+    def _to_int8(self, encodings):
+        return np.clip(np.round(encodings / self.i8_scale), -128, 127).astype(np.int8)
 
     def run_recognition_loop(self):
         print(f"Starting face recognition from UDP stream on port {self.config['VIDEO_STREAM_PORT']}")
@@ -50,53 +355,126 @@ class FaceRecognizer:
         ffmpeg_proc, pipe = stream_via_ffmpeg(
             self.config['VIDEO_STREAM_PORT'],
             self.config['VIDEO_WIDTH'],
-            self.config['VIDEO_HEIGHT']
+            self.config['VIDEO_HEIGHT'],
+            input_args=['-fflags', 'nobuffer', '-flags', 'low_delay', '-probesize', '32']
         )
 
+        reader_thread = threading.Thread(target=self._read_frames_worker, args=(pipe,), daemon=True)
+        reader_thread.start()
+        detector_thread = threading.Thread(target=self._detect_frames_worker, daemon=True)
+        detector_thread.start()
         worker_thread = threading.Thread(target=self._process_frames_worker, daemon=True)
         worker_thread.start()
 
+        # Display stays on this (main) thread: HighGUI is not thread-safe on every platform,
+        # and imshow/waitKey no longer hold up detection or recognition
         try:
             while not self.stop_event.is_set():
                 try:
-                    frame = next(pipe)
-                    if not self.frame_queue.full():
-                        self.frame_queue.put(frame)
-                except StopIteration:
-                    print("FFmpeg pipe closed.")
+                    display_frame = self.display_q.get(timeout=0.1)
+                    cv2.imshow('Face Recognition', display_frame)
+                except queue.Empty:
+                    # Keep servicing the window while the stream stalls
+                    pass
+                if cv2.waitKey(1) & 0xFF == ord('q'):
                     break
         finally:
             self.stop_event.set()
-            worker_thread.join()
+            # Killing ffmpeg first unblocks the reader if it is waiting on the pipe
             if ffmpeg_proc:
                 ffmpeg_proc.kill()
+            reader_thread.join(timeout=1)
+            detector_thread.join()
+            worker_thread.join()
             cv2.destroyAllWindows()
 
-    def _process_frames_worker(self):
+    def _read_frames_worker(self, pipe):
+        for frame in pipe:
+            if self.stop_event.is_set():
+                return
+            # Newest wins: when the detector lags, drop the stalest frame, not this one
+            self._put_latest(self.frame_queue, frame)
+        print("FFmpeg pipe closed.")
+        self.stop_event.set()
+
+    def _put_latest(self, q, item):
+        """Put without blocking, dropping the oldest queued item if the queue is full"""
+        while True:
+            try:
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _pin_stage(self, stage):
+        # Optional STAGE_CPU_AFFINITY, e.g. {'detect': [0, 1], 'recognize': [2, 3]}, keeps the
+        # two compute-heavy stages on separate cores. On Linux, pid 0 means the calling thread.
+        cpus = self.config.get('STAGE_CPU_AFFINITY', {}).get(stage)
+        if cpus and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, cpus)
+
+    def _detect_frames_worker(self):
+        # Detection runs here so it overlaps with encoding/compare of the previous frame
+        self._pin_stage('detect')
         while not self.stop_event.is_set():
             try:
                 frame = self.frame_queue.get(timeout=1)
-                display_frame, confirmed_users = self.process_frame(frame)
+            except queue.Empty:
+                continue
+            # ffmpeg repeats the last frame during network stalls; skip those outright
+            if self._is_repeat_frame(frame):
+                continue
+            # Frames that arrived while this one was being detected are already gone from
+            # frame_queue, so detection time is never spent on frames nobody will see
+            boxes, static = self._boxes_for(frame)
+            self._put_latest(self.det_queue, (frame, boxes, static))
 
-                for user in confirmed_users:
-                    self.play_welcome_message(user)
+    def _is_repeat_frame(self, frame):
+        # A strided ~1 KB sample is enough to tell a repeated frame from live video
+        h = _fingerprint(frame[::32, ::32, 0].tobytes())
+        if h == self._last_frame_hash:
+            return True
+        self._last_frame_hash = h
+        return False
 
-                cv2.imshow('Face Recognition', display_frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    self.stop_event.set()
+    def _process_frames_worker(self):
+        self._pin_stage('recognize')
+        while not self.stop_event.is_set():
+            try:
+                frame, boxes, static = self.det_queue.get(timeout=1)
+                # Nothing moved and no streak in progress: reuse the last display frame
+                if static and self._last_display is not None and not any(self.detection_streak.values()):
+                    display_frame = self._last_display
+                else:
+                    display_frame, confirmed_users = self.process_frame(frame, boxes)
+                    self._last_display = display_frame
+
+                    for user in confirmed_users:
+                        self.play_welcome_message(user)
+
+                self._put_latest(self.display_q, display_frame)
             except queue.Empty:
                 continue
 
-    def process_frame(self, frame):
-        display_frame = frame.copy()
-        (h, w) = frame.shape[:2]
-        blob = cv2.dnn.blobFromImage(
-            frame, 1.0, (300, 300),
-            (104.0, 177.0, 123.0)
-        )
-        self.face_net.setInput(blob)
+    def _ensure_frame_buffers(self, frame):
+        if self._rgb_buf is None or self._rgb_buf.shape != frame.shape:
+            self._rgb_buf = np.empty_like(frame)
+
+    def _detect_faces(self, frame, src):
+        if isinstance(src, cv2.UMat):
+            # Only the 300x300 result comes back to the host
+            np.copyto(self._det_input, cv2.resize(src, (300, 300), interpolation=cv2.INTER_AREA).get())
+        else:
+            cv2.resize(src, (300, 300), dst=self._det_input, interpolation=cv2.INTER_AREA)
+        # HWC uint8 -> CHW float32 minus the mean in one pass (what blobFromImage does)
+        np.subtract(self._det_input.transpose(2, 0, 1), self._blob_mean, out=self._blob_buf[0])
+        self.face_net.setInput(self._blob_buf)
         detections = self.face_net.forward()
 
+        (h, w) = frame.shape[:2]
         boxes = []
         for i in range(0, detections.shape[2]):
             confidence = detections[0, 0, i, 2]
@@ -104,41 +482,132 @@ class FaceRecognizer:
                 box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
                 (x1, y1, x2, y2) = box.astype("int")
                 boxes.append((y1, x2, y2, x1))
+        return boxes
+
+    def _is_static(self, frame):
+        if self._bg is not None:
+            # Foreground pixels against a running background model also catch slow movement
+            mask = self._bg.apply(cv2.resize(frame, (160, 120), interpolation=cv2.INTER_AREA))
+            return cv2.countNonZero(mask) < self._motion_min_pixels
+        # Mean absolute difference of tiny grayscale thumbnails; far cheaper than a forward pass
+        small = cv2.cvtColor(cv2.resize(frame, (80, 60), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        prev, self._prev_small = self._prev_small, small
+        # cv2.mean rather than ndarray.mean so this also works on UMat thumbnails
+        return prev is not None and cv2.mean(cv2.absdiff(small, prev))[0] < self._motion_eps
+
+    def _boxes_for(self, frame):
+        """Return (boxes, static) for `frame`"""
+        # Detect every DETECT_EVERY_N_FRAMES on moving scenes, and always after IDLE_REFRESH_FRAMES
+        src = cv2.UMat(frame) if self._use_umat else frame
+        self._frame_index += 1
+        self._since_detect += 1
+        static = self._is_static(src) and self._since_detect < self._idle_refresh
+        if self._last_boxes is None or self._since_detect >= self._idle_refresh \
+                or (not static and self._frame_index % self._detect_every == 0):
+            self._last_boxes = self._detect_faces(frame, src)
+            self._since_detect = 0
+        return self._last_boxes, static
+
+    def _crop_hash(self, frame, box):
+        """64-bit average hash of the face crop (8x8 grayscale vs its mean), or None if empty"""
+        (top, right, bottom, left) = (int(v) for v in box)
+        crop = frame[max(top, 0):bottom, max(left, 0):right]
+        if crop.size == 0:
+            return None
+        small = cv2.resize(cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY), (8, 8), interpolation=cv2.INTER_AREA)
+        return int.from_bytes(np.packbits(small > small.mean()).tobytes(), 'big')
+
+    def _encodings_for(self, frame, boxes):
+        """(n, 128) encodings for `boxes`, reused from the cache for unmoved, same-looking crops"""
+        out = np.empty((len(boxes), 128), dtype=np.float32)
+        keys = [None] * len(boxes)
+        if self._enc_cache_size:
+            for i, box in enumerate(boxes):
+                h = self._crop_hash(frame, box)
+                if h is not None:
+                    keys[i] = (tuple(int(v) // 16 for v in box), h)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self._enc_cache.get(key) if key is not None else None
+            if cached is not None and cached[1] > self._recog_index:
+                self._enc_cache.move_to_end(key)
+                out[i] = cached[0]
+            else:
+                missing.append(i)
+
+        if missing:
+            self._ensure_frame_buffers(frame)
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
+            fresh = self._face_recognition_encodings(rgb, [boxes[i] for i in missing])
+            expire = self._recog_index + self._enc_cache_ttl
+            for i, enc in zip(missing, fresh):
+                out[i] = enc
+                if keys[i] is not None:
+                    # Copy: `fresh` is a view of the reused scratch buffer
+                    self._enc_cache[keys[i]] = (enc.copy(), expire)
+                    self._enc_cache.move_to_end(keys[i])
+                    if len(self._enc_cache) > self._enc_cache_size:
+                        self._enc_cache.popitem(last=False)
+        return out
+
+    def _names_for_boxes(self, frame, boxes):
+        # Faces barely move between frames: a box landing in the same 16px grid cell as a
+        # recent one reuses that name and skips encoding + compare until the entry expires
+        self._recog_index += 1
+        self._tracked = {k: v for k, v in self._tracked.items() if v[1] > self._recog_index}
+
+        keys = [tuple(int(v) // 16 for v in box) for box in boxes]
+        names = [None] * len(boxes)
+        pending = []
+        for i, key in enumerate(keys):
+            hit = self._tracked.get(key)
+            if hit:
+                names[i] = hit[0]
+            else:
+                pending.append(i)
+
+        if pending:
+            encodings = self._encodings_for(frame, [boxes[i] for i in pending])
+            expire = self._recog_index + self._track_ttl
+            for i, name in zip(pending, self._recognize_batch(encodings)):
+                names[i] = name
+                self._tracked[keys[i]] = (name, expire)
+        return names
+
+    def process_frame(self, frame, boxes=None):
+        """Recognize faces in `frame` and return (display_frame, confirmed_users).
+        display_frame is `frame` itself when nothing was drawn, so treat it as read-only."""
+        if boxes is None:
+            boxes = self._boxes_for(frame)[0]
 
         detected_users = set()
         confirmed_users = []
 
-        if boxes:
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            encodings = self._face_recognition_encodings(rgb, boxes)
-            for i, encoding in enumerate(encodings):
-                matches = self._face_recognition_compare_faces(self.data['encodings'], encoding)
-                name = 'Unknown'
-                if True in matches:
-                    idxs = [j for j, m in enumerate(matches) if m]
-                    counts = {}
-                    for j in idxs:
-                        n = self.data['names'][j]
-                        counts[n] = counts.get(n, 0) + 1
-                    name = max(counts, key=counts.get) if counts else 'Unknown'
-
-                if name != 'Unknown':
-                    detected_users.add(name)
-                    (top, right, bottom, left) = boxes[i]
-                    cv2.rectangle(display_frame, (left, top), (right, bottom), (0, 255, 0), 2)
-                    y = top - 15 if top > 15 else top + 15
-                    cv2.putText(
-                        display_frame, name, (left, y), cv2.FONT_HERSHEY_SIMPLEX,
-                        0.75, (0, 255, 0), 2
-                    )
+        names = self._names_for_boxes(frame, boxes)
+        recognized = [(box, name) for box, name in zip(boxes, names) if name != 'Unknown']
+
+        # Only pay for a display copy when there is something to draw on it. The copy is
+        # fresh rather than a reused buffer since the main thread may still be showing the last one.
+        if recognized:
+            display_frame = frame.copy()
+            outlines = [
+                np.array([[left, top], [right, top], [right, bottom], [left, bottom]], dtype=np.int32)
+                for (top, right, bottom, left), _ in recognized
+            ]
+            cv2.polylines(display_frame, outlines, True, (0, 255, 0), 2)
+            for box, name in recognized:
+                detected_users.add(name)
+                self._draw_overlay(display_frame, name, box)
+        else:
+            display_frame = frame
 
-        current_time = datetime.datetime.now()
+        current_time = time.monotonic()
 
         for user in detected_users:
             self.detection_streak[user] += 1
             if self.detection_streak[user] >= 3:
                 last = self.last_seen.get(user)
-                if not last or (current_time - last).total_seconds() > self.config['RECOGNITION_TIMEOUT']:
+                if last is None or current_time - last > self.config['RECOGNITION_TIMEOUT']:
                     confirmed_users.append(user)
                 self.last_seen[user] = current_time
                 self.detection_streak[user] = 0
@@ -152,26 +621,158 @@ class FaceRecognizer:
 
         return display_frame, confirmed_users
 
+    def _draw_overlay(self, display_frame, name, box):
+        (top, right, bottom, left) = (int(v) for v in box)
+        # Each name is rasterized once; putText is slow enough to matter per frame
+        cached = self._label_cache.get(name)
+        if cached is None:
+            cached = self._label_cache[name] = self._render_label(name)
+        patch, mask, dx, dy = cached
+        y = top - 15 if top > 15 else top + 15
+        x0, y0 = left + dx, y + dy
+        h, w = display_frame.shape[:2]
+        # Clip the patch to the frame
+        px0, py0 = max(-x0, 0), max(-y0, 0)
+        px1, py1 = min(patch.shape[1], w - x0), min(patch.shape[0], h - y0)
+        if px1 <= px0 or py1 <= py0:
+            return
+        roi = display_frame[y0 + py0:y0 + py1, x0 + px0:x0 + px1]
+        np.copyto(roi, patch[py0:py1, px0:px1], where=mask[py0:py1, px0:px1, None])
+
+    def _render_label(self, name):
+        """Rasterize `name` onto a small patch; returns (patch, mask, dx, dy), the offset
+        of the patch's top-left corner from the putText origin"""
+        (tw, th), baseline = cv2.getTextSize(name, cv2.FONT_HERSHEY_SIMPLEX, 0.75, 2)
+        # Two pixels of slack on every side for the stroke thickness
+        dx, dy = -2, -th - 2
+        patch = np.zeros((th + baseline + 4, tw + 4, 3), dtype=np.uint8)
+        cv2.putText(patch, name, (-dx, -dy), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (0, 255, 0), 2)
+        return patch, patch.any(axis=2), dx, dy
+
+    def _load_face_encoder(self):
+        # Same models face_recognition.face_encodings uses (5-point landmarks + ResNet),
+        # loaded directly so faces can be pushed through dlib in batches
+        import dlib
+        import face_recognition_models
+        self._pose_predictor = dlib.shape_predictor(face_recognition_models.pose_predictor_five_point_model_location())
+        self._face_encoder = dlib.face_recognition_model_v1(face_recognition_models.face_recognition_model_location())
+        self._dlib = dlib
+
     def _face_recognition_encodings(self, image, boxes):
-        import face_recognition
-        return face_recognition.face_encodings(image, boxes)
+        """Encode the faces in `boxes`, returned as an (n, 128) float32 view of a reused buffer.
+        The view is overwritten by the next call; copy rows that need to outlive it."""
+        if self._face_encoder is None:
+            self._load_face_encoder()
+        dlib = self._dlib
+
+        # Align every face to a 150x150 chip, then run the ResNet over the chips in
+        # batches of ENCODING_BATCH_SIZE instead of one forward pass per face
+        chips = []
+        for (top, right, bottom, left) in boxes:
+            shape = self._pose_predictor(image, dlib.rectangle(int(left), int(top), int(right), int(bottom)))
+            chips.append(dlib.get_face_chip(image, shape, size=150, padding=0.25))
+
+        if len(chips) > len(self._enc_scratch):
+            self._enc_scratch = np.empty((len(chips), 128), dtype=np.float32)
+        out = self._enc_scratch[:len(chips)]
+        for start in range(0, len(chips), self._encoding_batch_size):
+            batch = chips[start:start + self._encoding_batch_size]
+            for i, desc in enumerate(self._face_encoder.compute_face_descriptor(batch, num_jitters=0)):
+                out[start + i] = desc
+        return out
 
-    def _face_recognition_compare_faces(self, known_encodings, face_encoding, tolerance=0.6):
-        import face_recognition
-        return face_recognition.compare_faces(known_encodings, face_encoding, tolerance)
+    def _face_recognition_compare_faces(self, face_encodings, tolerance=0.6):
+        """Same Euclidean test as face_recognition.compare_faces, for a whole (M, 128) batch.
+        Returns an (M, N) boolean match matrix against the known encodings."""
+        q = np.atleast_2d(np.asarray(face_encodings, dtype=np.float32))
+        if _l2_scan is not None and q.shape[1] == 128:
+            # Native AVX2 scan, one query at a time; no BLAS thread start-up for tiny batches
+            q = np.ascontiguousarray(q)
+            known = np.ascontiguousarray(self.known_matrix, dtype=np.float32)
+            d2 = np.empty((len(q), len(known)), dtype=np.float32)
+            for row, out in zip(q, d2):
+                _l2_scan(row.ctypes.data, known.ctypes.data, len(known), out.ctypes.data)
+            return d2 <= tolerance ** 2
+        # |q - k|^2 = |q|^2 + |k|^2 - 2 q.k, so the whole batch is a single GEMM
+        d2 = (q * q).sum(axis=1)[:, None] + self.known_sq[None, :] - 2 * (q @ self.known_matrix.T)
+        return d2 <= tolerance ** 2
+
+    def _recognize_batch(self, encodings, tolerance=0.6):
+        """Names for an (M, 128) batch of encodings, 'Unknown' where nothing matches"""
+        if not len(encodings):
+            return []
+        if self.ann_index is not None:
+            k = min(self.config.get('ANN_K', 5), len(self.known_matrix))
+            labels, d2 = self._ann_query(encodings, k)
+            rows, nth = np.nonzero(d2 <= tolerance ** 2)
+            return self._vote_names(rows, labels[rows, nth], len(encodings))
+        if self.known_i8 is not None:
+            d2 = self._int8_distances(self._to_int8(encodings))
+            rows, cols = np.nonzero(d2 <= (tolerance / self.i8_scale) ** 2)
+            return self._vote_names(rows, cols, len(encodings))
+        # A built encdist kernel was opted into explicitly, so it goes ahead of numba
+        if _compare_and_vote is not None and _l2_scan is None:
+            best = _compare_and_vote(self.known_matrix, self.known_sq, np.ascontiguousarray(encodings),
+                                     self.name_idx, len(self.unique_names), tolerance)
+            return [str(self.unique_names[b]) if b >= 0 else 'Unknown' for b in best]
+        rows, cols = np.nonzero(self._face_recognition_compare_faces(encodings, tolerance))
+        return self._vote_names(rows, cols, len(encodings))
+
+    def _vote_names(self, rows, cols, m):
+        """Majority name vote for each of `m` queries, where query rows[i] matched known
+        encoding cols[i]. One bincount over (query, name) pairs covers the whole batch.
+        Ties go to the alphabetically first name, since unique_names is sorted."""
+        n_names = len(self.unique_names)
+        if not n_names:
+            return ['Unknown'] * m
+        pairs = rows * n_names + self.name_idx[cols]
+        votes = np.bincount(pairs, minlength=m * n_names).reshape(m, n_names)
+        best = votes.argmax(axis=1)
+        return [str(self.unique_names[b]) if votes[i, b] else 'Unknown' for i, b in enumerate(best)]
 
     def set_recognition_callback(self, callback):
         self.recognition_callback = callback
 
+    def _load_welcome_sounds(self):
+        # Decode every <user>Recog.mp3/.wav once so a recognition never touches the disk
+        voice_dir = self.config.get('VOICE_LINES_DIR', 'voice_lines')
+        welcomes = {}
+        if not os.path.isdir(voice_dir):
+            print(f"Warning: Voice lines directory {voice_dir} not found")
+            return welcomes
+        for filename in os.listdir(voice_dir):
+            stem, ext = os.path.splitext(filename)
+            if not stem.endswith('Recog') or ext.lower() not in ('.mp3', '.wav'):
+                continue
+            try:
+                welcomes[stem[:-len('Recog')]] = pygame.mixer.Sound(os.path.join(voice_dir, filename))
+            except pygame.error as e:
+                print(f"Warning: Could not load voice file {filename}: {e}")
+        print(f"Loaded {len(welcomes)} welcome voice lines")
+        return welcomes
+
     def play_welcome_message(self, user):
-        filename = f"{user}Recog.mp3"
-        filepath = os.path.join(self.config['VOICE_LINES_DIR'], filename)
-        if not os.path.exists(filepath):
-            print(f"Warning: Voice file {filepath} not found")
+        """Queue a welcome for `user` without blocking; dropped if the audio thread is backed up"""
+        try:
+            self.audio_q.put_nowait(user)
+        except queue.Full:
+            print(f"Audio queue full, skipping welcome message for {user}")
+
+    def _audio_worker(self):
+        while not self.stop_event.is_set():
+            try:
+                user = self.audio_q.get(timeout=1)
+            except queue.Empty:
+                continue
+            self._play_welcome(user)
+
+    def _play_welcome(self, user):
+        sound = self._welcomes.get(user)
+        if sound is None:
+            print(f"Warning: Voice file for {user} not found")
             return
 
         print(f"Playing welcome message for {user}")
-        pygame.mixer.music.load(filepath)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():
-            time.sleep(0.1)
\ No newline at end of file
+        sound.play()
+        # Hold the audio worker until the line finishes so welcomes don't overlap
+        self.stop_event.wait(sound.get_length())
\ No newline at end of file